@@ -1,14 +1,81 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import IntegrityError, OperationalError
+import random
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
 
 # Database path
 DB_URL = "sqlite:///data/movies.db"
+
+# SQLite caps bound parameters per statement; each movie row uses four
+BULK_CHUNK_SIZE = 999 // 4
+
+# Cached result of list_movies(), cleared by every write
+_cache = None
+
+# Prepared statements, built once so SQLAlchemy's compiled cache is reused
+SQL_LIST = text("SELECT title, year, rating, poster_url FROM movies")
+SQL_LIST_DESC = text(
+    "SELECT title, year, rating, poster_url FROM movies "
+    "ORDER BY rating DESC, id ASC"
+)
+SQL_LIST_ASC = text(
+    "SELECT title, year, rating, poster_url FROM movies "
+    "ORDER BY rating ASC, id ASC"
+)
+SQL_SCHEMA_EXISTS = text(
+    "SELECT COUNT(*) FROM sqlite_master "
+    "WHERE (type = 'table' AND name = 'movies') "
+    "OR (type = 'index' AND name = 'idx_movies_rating')"
+)
+SQL_COUNT = text("SELECT COUNT(*) FROM movies")
+SQL_RANDOM = text(
+    "SELECT title, year, rating FROM movies LIMIT 1 OFFSET :offset"
+)
+SQL_SEARCH = text(
+    "SELECT title, year, rating, poster_url FROM movies "
+    "WHERE py_lower(title) LIKE :q ESCAPE '\\'"
+)
+SQL_AVG = text("SELECT AVG(rating) FROM movies")
+SQL_BEST = text(
+    "SELECT title, rating FROM movies ORDER BY rating DESC, id ASC LIMIT 1"
+)
+SQL_WORST = text(
+    "SELECT title, rating FROM movies ORDER BY rating ASC, id ASC LIMIT 1"
+)
+SQL_INSERT = text(
+    "INSERT OR IGNORE INTO movies (title, year, rating, poster_url) "
+    "VALUES (:title, :year, :rating, :poster_url)"
+)
+SQL_DELETE = text("DELETE FROM movies WHERE title = :title")
+SQL_UPDATE = text("UPDATE movies SET rating = :rating WHERE title = :title")
+
 engine = create_engine(DB_URL)
 
 
+def _py_lower(value):
+    """Lowercase a SQLite value with Python's Unicode rules."""
+    return value.lower() if isinstance(value, str) else value
+
+
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_conn, connection_record):
+    """Tune SQLite for concurrent reads and cheaper writes."""
+    # SQLite's lower() only folds ASCII; searches need Unicode case folding
+    dbapi_conn.create_function("py_lower", 1, _py_lower, deterministic=True)
+    if ":memory:" in DB_URL:
+        return
+    dbapi_conn.execute("PRAGMA journal_mode=WAL")
+    dbapi_conn.execute("PRAGMA synchronous=NORMAL")
+    dbapi_conn.execute("PRAGMA busy_timeout=30000")
+    dbapi_conn.execute("PRAGMA temp_store=MEMORY")
+    dbapi_conn.execute("PRAGMA cache_size=-20000")
+
+
 def create_table():
     """Create the movies table if it does not exist."""
     with engine.connect() as connection:
+        if connection.execute(SQL_SCHEMA_EXISTS).scalar() == 2:
+            return
         connection.execute(text("""
             CREATE TABLE IF NOT EXISTS movies (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -18,39 +85,140 @@ def create_table():
                 poster_url TEXT
             )
         """))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_movies_rating ON movies (rating)"
+        ))
         connection.commit()
 
 
+def _invalidate_cache():
+    """Drop the cached list_movies() result after a write."""
+    global _cache
+    _cache = None
+
+
 def list_movies():
-    """Retrieve all movies from the database."""
+    """Retrieve all movies from the database.
+
+    Returns a shallow copy of the cached dict, so adding or removing keys
+    doesn't affect the cache. Treat the per-movie dicts as read-only.
+    """
+    global _cache
+    if _cache is not None:
+        return dict(_cache)
+    try:
+        with _conn.begin():
+            result = _conn.execute(SQL_LIST)
+            _cache = {
+                row.title: {
+                    "year": row.year,
+                    "rating": row.rating,
+                    "poster_url": row.poster_url
+                }
+                for row in result
+            }
+            return dict(_cache)
+    except OperationalError as e:
+        print(f"Database error: {e}")
+        return {}
+
+
+def iter_movies():
+    """Yield (title, year, rating, poster_url) rows one at a time.
+
+    Uses its own connection so other storage calls can run while the
+    generator is suspended.
+    """
     try:
         with engine.connect() as connection:
-            result = connection.execute(
-                text("SELECT title, year, rating, poster_url FROM movies")
+            for row in connection.execute(SQL_LIST):
+                yield tuple(row)
+    except OperationalError as e:
+        print(f"Database error: {e}")
+
+
+def list_movies_sorted(desc=True):
+    """Retrieve (title, year, rating, poster_url) tuples ordered by rating."""
+    statement = SQL_LIST_DESC if desc else SQL_LIST_ASC
+    try:
+        with _conn.begin():
+            result = _conn.execute(statement)
+            return [tuple(row) for row in result]
+    except OperationalError as e:
+        print(f"Database error: {e}")
+        return []
+
+
+def get_random_movie():
+    """Return a random (title, year, rating) tuple, or None if empty."""
+    try:
+        with _conn.begin():
+            count = _conn.execute(SQL_COUNT).scalar()
+            if not count:
+                return None
+            row = _conn.execute(
+                SQL_RANDOM,
+                {"offset": random.randrange(count)}
+            ).fetchone()
+            return tuple(row) if row else None
+    except OperationalError as e:
+        print(f"Database error: {e}")
+        return None
+
+
+def search_movies(query):
+    """Retrieve movies whose title contains query (case-insensitive)."""
+    pattern = (
+        query.lower()
+        .replace("\\", "\\\\")
+        .replace("%", "\\%")
+        .replace("_", "\\_")
+    )
+    try:
+        with _conn.begin():
+            result = _conn.execute(
+                SQL_SEARCH,
+                {"q": f"%{pattern}%"}
             )
-            movies = result.fetchall()
             return {
-                row[0]: {
-                    "year": row[1],
-                    "rating": row[2],
-                    "poster_url": row[3]
+                row.title: {
+                    "year": row.year,
+                    "rating": row.rating,
+                    "poster_url": row.poster_url
                 }
-                for row in movies
+                for row in result
             }
     except OperationalError as e:
         print(f"Database error: {e}")
         return {}
 
 
+def get_stats():
+    """Return (avg, (best_title, best_rating), (worst_title, worst_rating)).
+
+    Returns None when the table is empty.
+    """
+    try:
+        with _conn.begin():
+            avg = _conn.execute(SQL_AVG).scalar()
+            if avg is None:
+                return None
+            best = _conn.execute(SQL_BEST).fetchone()
+            worst = _conn.execute(SQL_WORST).fetchone()
+            if not best or not worst:
+                return None
+            return avg, tuple(best), tuple(worst)
+    except OperationalError as e:
+        print(f"Database error: {e}")
+        return None
+
+
 def add_movie(title, year, rating, poster_url=""):
     """Add a new movie to the database."""
     try:
-        with engine.connect() as connection:
-            connection.execute(
-                text(
-                    "INSERT INTO movies (title, year, rating, poster_url) "
-                    "VALUES (:title, :year, :rating, :poster_url)"
-                ),
+        with _conn.begin():
+            result = _conn.execute(
+                SQL_INSERT,
                 {
                     "title": title,
                     "year": year,
@@ -58,27 +226,65 @@ def add_movie(title, year, rating, poster_url=""):
                     "poster_url": poster_url
                 }
             )
-            connection.commit()
-            print(f"Movie '{title}' added successfully.")
-    except IntegrityError:
-        print(f"Movie '{title}' already exists.")
+        if result.rowcount == 0:
+            print(f"Movie '{title}' already exists.")
+            return
+        _invalidate_cache()
+        print(f"Movie '{title}' added successfully.")
     except OperationalError as e:
         print(f"Database error: {e}")
 
 
+def add_movies_bulk(rows):
+    """Add many movies in one transaction, skipping existing titles.
+
+    rows is an iterable of (title, year, rating, poster_url) tuples.
+    """
+    rows = list(rows)
+    added = 0
+    try:
+        with _conn.begin():
+            for start in range(0, len(rows), BULK_CHUNK_SIZE):
+                chunk = rows[start:start + BULK_CHUNK_SIZE]
+                values = ", ".join(
+                    f"(:t{i}, :y{i}, :r{i}, :p{i})"
+                    for i in range(len(chunk))
+                )
+                params = {}
+                for i, (title, year, rating, poster_url) in enumerate(chunk):
+                    params[f"t{i}"] = title
+                    params[f"y{i}"] = year
+                    params[f"r{i}"] = rating
+                    params[f"p{i}"] = poster_url
+                result = _conn.execute(
+                    text(
+                        "INSERT OR IGNORE INTO movies "
+                        "(title, year, rating, poster_url) "
+                        f"VALUES {values}"
+                    ),
+                    params
+                )
+                added += result.rowcount
+        _invalidate_cache()
+        print(f"{added} of {len(rows)} movies added successfully.")
+    except OperationalError as e:
+        print(f"Database error: {e}")
+    return added
+
+
 def delete_movie(title):
     """Delete a movie from the database."""
     try:
-        with engine.connect() as connection:
-            result = connection.execute(
-                text("DELETE FROM movies WHERE title = :title"),
+        with _conn.begin():
+            result = _conn.execute(
+                SQL_DELETE,
                 {"title": title}
             )
-            connection.commit()
-            if result.rowcount > 0:
-                print(f"Movie '{title}' deleted successfully.")
-            else:
-                print(f"Movie '{title}' not found.")
+        if result.rowcount > 0:
+            _invalidate_cache()
+            print(f"Movie '{title}' deleted successfully.")
+        else:
+            print(f"Movie '{title}' not found.")
     except OperationalError as e:
         print(f"Database error: {e}")
 
@@ -86,22 +292,22 @@ def delete_movie(title):
 def update_movie(title, rating):
     """Update a movie's rating in the database."""
     try:
-        with engine.connect() as connection:
-            result = connection.execute(
-                text(
-                    "UPDATE movies SET rating = :rating "
-                    "WHERE title = :title"
-                ),
+        with _conn.begin():
+            result = _conn.execute(
+                SQL_UPDATE,
                 {"title": title, "rating": rating}
             )
-            connection.commit()
-            if result.rowcount > 0:
-                print(f"Movie '{title}' updated successfully.")
-            else:
-                print(f"Movie '{title}' not found.")
+        if result.rowcount > 0:
+            _invalidate_cache()
+            print(f"Movie '{title}' updated successfully.")
+        else:
+            print(f"Movie '{title}' not found.")
     except OperationalError as e:
         print(f"Database error: {e}")
 
 
 # Create table when module is loaded
 create_table()
+
+# Long-lived connection shared by the CRUD functions
+_conn = engine.connect()
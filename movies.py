@@ -1,6 +1,11 @@
-import random
 import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from string import Template
+import orjson
 import requests
+import requests_cache
 from dotenv import load_dotenv
 import movie_storage_sql as storage
 
@@ -10,6 +15,16 @@ load_dotenv()
 API_KEY = os.getenv("OMDB_API_KEY", "")
 API_URL = "http://www.omdbapi.com/"
 
+# Cache OMDb responses on disk for a day
+CACHE_PATH = os.path.join("data", "omdb_cache")
+CACHE_EXPIRE_SECONDS = 86400
+session = requests_cache.CachedSession(
+    CACHE_PATH,
+    backend="sqlite",
+    expire_after=CACHE_EXPIRE_SECONDS
+)
+FETCH_WORKERS = 8
+
 # Color theme
 THEME = "\033[0;92;40m"
 RESET = "\033[0m"
@@ -21,6 +36,25 @@ MIN_YEAR = 1888
 MAX_YEAR = 2026
 MIN_RATING = 0
 MAX_RATING = 10
+NUMBER_PATTERN = re.compile(
+    r"^[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?$"
+)
+INTEGER_PATTERN = re.compile(r"^[+-]?\d+$")
+
+# Pre-built dot leader sliced by format_movie_line
+DOTS = "." * 128
+
+# Static HTML fragments for the website movie grid
+MOVIE_ITEM_OPEN = "        <li>\n            <div class='movie'>\n"
+MOVIE_ITEM_CLOSE = "            </div>\n        </li>\n"
+POSTER_HTML = (
+    "                <img class='movie-poster' "
+    "src='{poster}' alt='{title}'/>\n"
+)
+
+# Website template, compiled on first use by get_template
+TEMPLATE_PATH = os.path.join("_static", "index_template.html")
+_template = None
 
 
 def clear():
@@ -32,12 +66,16 @@ def format_movie_line(title, info, width=45):
     """Build a formatted line for movie display."""
     rating = info.get("rating", 0.0)
     year = info.get("year", "")
-    label = f" {title} ({year})"
-    value = f" {rating}"
-    dots = width - len(label) - len(value)
-    if dots < 3:
-        dots = 3
-    return f"{label} {'.' * dots}{value}"
+    label_len = len(title) + len(str(year)) + 4
+    value_len = len(str(rating)) + 1
+    dots = max(3, width - label_len - value_len)
+    leader = DOTS[:dots] if dots <= len(DOTS) else "." * dots
+    return f" {title} ({year}) {leader} {rating}"
+
+
+def print_lines(lines, color):
+    """Write colored lines to stdout in a single call."""
+    sys.stdout.write("".join(f"{color}{line}{RESET}\n" for line in lines))
 
 
 def fetch_movie_data(title):
@@ -46,12 +84,12 @@ def fetch_movie_data(title):
         print(f"{RED}  API key not found. Check your .env file.{RESET}")
         return None
     try:
-        response = requests.get(
+        response = session.get(
             API_URL,
             params={"apikey": API_KEY, "t": title},
             timeout=10
         )
-        data = response.json()
+        data = orjson.loads(response.content)
         if data.get("Response") == "True":
             return {
                 "title": data.get("Title", title),
@@ -65,31 +103,54 @@ def fetch_movie_data(title):
     except requests.exceptions.RequestException as e:
         print(f"{RED}  API error: {e}{RESET}")
         return None
+    except orjson.JSONDecodeError as e:
+        print(f"{RED}  Invalid API response: {e}{RESET}")
+        return None
+
+
+def fetch_many(titles):
+    """Fetch several titles from OMDb in parallel, in input order."""
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        return list(executor.map(fetch_movie_data, titles))
+
+
+def add_movies_batch(titles):
+    """Fetch several titles from OMDb and store the found ones at once."""
+    rows = [
+        (data["title"], data["year"], data["rating"],
+         data.get("poster_url", ""))
+        for data in fetch_many(titles)
+        if data
+    ]
+    if rows:
+        storage.add_movies_bulk(rows)
 
 
 def get_valid_rating():
     """Ask for a rating between 0 and 10."""
     while True:
-        try:
-            rating = float(input("  Enter rating (0-10): "))
-            if MIN_RATING <= rating <= MAX_RATING:
-                return rating
-            print(f"{RED}  Rating must be between 0 and 10.{RESET}")
-        except ValueError:
+        entry = input("  Enter rating (0-10): ").strip()
+        if not NUMBER_PATTERN.match(entry):
             print(f"{RED}  Please enter a valid number.{RESET}")
+            continue
+        rating = float(entry)
+        if MIN_RATING <= rating <= MAX_RATING:
+            return rating
+        print(f"{RED}  Rating must be between 0 and 10.{RESET}")
 
 
 def get_valid_year():
     """Ask for a valid year."""
     while True:
-        try:
-            year = int(input("  Enter year: "))
-            if MIN_YEAR <= year <= MAX_YEAR:
-                return year
-            print(f"{RED}  Year must be between "
-                  f"{MIN_YEAR} and {MAX_YEAR}.{RESET}")
-        except ValueError:
+        entry = input("  Enter year: ").strip()
+        if not INTEGER_PATTERN.match(entry):
             print(f"{RED}  Please enter a valid year.{RESET}")
+            continue
+        year = int(entry)
+        if MIN_YEAR <= year <= MAX_YEAR:
+            return year
+        print(f"{RED}  Year must be between "
+              f"{MIN_YEAR} and {MAX_YEAR}.{RESET}")
 
 
 def list_movies():
@@ -100,9 +161,10 @@ def list_movies():
         return
 
     print(f"\n{THEME}  {len(movies)} movies in total:{RESET}\n")
-    for title, info in movies.items():
-        line = format_movie_line(title, info)
-        print(f"{THEME}{line}{RESET}")
+    print_lines(
+        (format_movie_line(title, info) for title, info in movies.items()),
+        THEME
+    )
 
 
 def add_movies():
@@ -156,33 +218,29 @@ def update_movies():
 
 def stats_movies():
     """Show movie statistics."""
-    movies = storage.list_movies()
-    if not movies:
+    stats = storage.get_stats()
+    if not stats:
         print(f"\n{RED}  No movies to show stats for.{RESET}")
         return
 
-    ratings = [info["rating"] for info in movies.values()]
-    best = max(movies.items(), key=lambda x: x[1]["rating"])
-    worst = min(movies.items(), key=lambda x: x[1]["rating"])
-    avg = sum(ratings) / len(ratings)
+    avg, best, worst = stats
 
     print(f"\n{THEME}  STATISTICS{RESET}")
     print(f"  Average rating: {avg:.1f}")
-    print(f"  Best movie: {best[0]} ({best[1]['rating']})")
-    print(f"  Worst movie: {worst[0]} ({worst[1]['rating']})")
+    print(f"  Best movie: {best[0]} ({best[1]})")
+    print(f"  Worst movie: {worst[0]} ({worst[1]})")
 
 
 def random_movie():
     """Pick a random movie from the database."""
-    movies = storage.list_movies()
-    if not movies:
+    movie = storage.get_random_movie()
+    if not movie:
         print(f"\n{RED}  No movies available.{RESET}")
         return
 
-    title = random.choice(list(movies.keys()))
-    info = movies[title]
-    print(f"\n{GREEN}  Random pick: {title} ({info['year']}) "
-          f"- Rating: {info['rating']}{RESET}")
+    title, year, rating = movie
+    print(f"\n{GREEN}  Random pick: {title} ({year}) "
+          f"- Rating: {rating}{RESET}")
 
 
 def search_movie():
@@ -191,79 +249,80 @@ def search_movie():
     if not query:
         return
 
-    movies = storage.list_movies()
-    found = False
-    for title, info in movies.items():
-        if query in title.lower():
-            line = format_movie_line(title, info)
-            print(f"{GREEN}{line}{RESET}")
-            found = True
+    movies = storage.search_movies(query)
+    print_lines(
+        (format_movie_line(title, info) for title, info in movies.items()),
+        GREEN
+    )
 
-    if not found:
+    if not movies:
         print(f"{RED}  No movies found matching '{query}'.{RESET}")
 
 
 def movies_sorted_by_rating():
     """Display movies sorted by rating (highest first)."""
-    movies = storage.list_movies()
+    movies = storage.list_movies_sorted()
     if not movies:
         print(f"\n{RED}  No movies to sort.{RESET}")
         return
 
-    sorted_movies = sorted(
-        movies.items(),
-        key=lambda x: x[1]["rating"],
-        reverse=True
+    print(f"\n{THEME}  MOVIES SORTED BY RATING:{RESET}\n")
+    print_lines(
+        (
+            format_movie_line(title, {"rating": rating, "year": year})
+            for title, year, rating, _ in movies
+        ),
+        THEME
     )
 
-    print(f"\n{THEME}  MOVIES SORTED BY RATING:{RESET}\n")
-    for title, info in sorted_movies:
-        line = format_movie_line(title, info)
-        print(f"{THEME}{line}{RESET}")
+
+def compile_template(html):
+    """Turn the HTML template into a string.Template for one-pass filling."""
+    html = html.replace("$", "$$")
+    html = html.replace("__TEMPLATE_TITLE__", "$title")
+    html = html.replace("__TEMPLATE_MOVIE_GRID__", "$grid")
+    return Template(html)
+
+
+def get_template():
+    """Return the compiled website template, reading it only once."""
+    global _template
+    if _template is None:
+        with open(TEMPLATE_PATH, "r") as f:
+            _template = compile_template(f.read())
+    return _template
 
 
 def generate_website():
     """Generate a static HTML website from the movie database."""
     movies = storage.list_movies()
 
-    template_path = os.path.join("_static", "index_template.html")
     try:
-        with open(template_path, "r") as f:
-            template = f.read()
+        template = get_template()
     except FileNotFoundError:
-        print(f"{RED}  Template not found: {template_path}{RESET}")
+        print(f"{RED}  Template not found: {TEMPLATE_PATH}{RESET}")
         return
 
-    movie_grid = ""
+    parts = []
     for title, info in movies.items():
         poster = info.get("poster_url", "")
         year = info.get("year", "")
         rating = info.get("rating", 0)
 
-        movie_grid += "        <li>\n"
-        movie_grid += "            <div class='movie'>\n"
+        poster_html = ""
         if poster and poster != "N/A":
-            movie_grid += (
-                f"                <img class='movie-poster' "
-                f"src='{poster}' alt='{title}'/>\n"
-            )
-        movie_grid += (
-            f"                <div class='movie-title'>"
-            f"{title}</div>\n"
-        )
-        movie_grid += (
-            f"                <div class='movie-year'>"
-            f"{year}</div>\n"
-        )
-        movie_grid += (
+            poster_html = POSTER_HTML.format(poster=poster, title=title)
+        parts.append(
+            f"{MOVIE_ITEM_OPEN}{poster_html}"
+            f"                <div class='movie-title'>{title}</div>\n"
+            f"                <div class='movie-year'>{year}</div>\n"
             f"                <div class='movie-rating'>"
             f"Rating: {rating}</div>\n"
+            f"{MOVIE_ITEM_CLOSE}"
         )
-        movie_grid += "            </div>\n"
-        movie_grid += "        </li>\n"
+    movie_grid = "".join(parts)
 
-    output = template.replace("__TEMPLATE_TITLE__", "My Movie App")
-    output = output.replace("__TEMPLATE_MOVIE_GRID__", movie_grid)
+    output = template.substitute(title="My Movie App", grid=movie_grid)
 
     output_path = os.path.join("_static", "index.html")
     with open(output_path, "w") as f:
@@ -273,6 +332,20 @@ def generate_website():
     print(f"  Open {output_path} to view it.")
 
 
+# Menu choice -> handler
+MENU_ACTIONS = {
+    "1": list_movies,
+    "2": add_movies,
+    "3": del_movies,
+    "4": update_movies,
+    "5": stats_movies,
+    "6": random_movie,
+    "7": search_movie,
+    "8": movies_sorted_by_rating,
+    "9": generate_website,
+}
+
+
 def main():
     """Main menu loop for the movie app."""
     os.makedirs("data", exist_ok=True)
@@ -301,24 +374,10 @@ def main():
         if choice == "0":
             print(f"\n{GREEN}  Bye! See you next time.{RESET}")
             return
-        elif choice == "1":
-            list_movies()
-        elif choice == "2":
-            add_movies()
-        elif choice == "3":
-            del_movies()
-        elif choice == "4":
-            update_movies()
-        elif choice == "5":
-            stats_movies()
-        elif choice == "6":
-            random_movie()
-        elif choice == "7":
-            search_movie()
-        elif choice == "8":
-            movies_sorted_by_rating()
-        elif choice == "9":
-            generate_website()
+
+        action = MENU_ACTIONS.get(choice)
+        if action:
+            action()
         else:
             print(f"{RED}  Invalid choice. Try again.{RESET}")
 